@@ -8,32 +8,123 @@ played together.
 """
 
 import argparse
+import asyncio
+import threading
 import requests
-from bs4 import BeautifulSoup
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
 import re
-from collections import defaultdict
+from collections import Counter
+import string
 import sys
 from urllib.parse import urljoin, urlparse
 import time
 
+# Polite crawling limits: at most this many team pages in flight at once,
+# and at least this many seconds between requests per fetch slot
+MAX_CONCURRENT_FETCHES = 5
+REQUEST_INTERVAL = 1.0
+
+# Patterns used in the parsing hot paths, compiled once at import time.
+# The href patterns capture the numeric id so that matching a link and
+# extracting its id is a single regex pass.
+_TEAM_HREF_RE = re.compile(r'teaminfo\.asp\?id=(\d+)')
+_PLAYER_HREF_RE = re.compile(r'playermatches\.asp\?id=(\d+)')
+_NAME_RE = re.compile(r'^[A-Za-z\s,.]+$')
+
+# Characters a player name may contain; membership is checked with a
+# C-level set operation rather than a regex
+_ALLOWED_NAME_CHARS = frozenset(string.ascii_letters + ' ,.')
+
+# Words that mark a table cell as a label, header, or status rather than a
+# player name. Lowercased once here so the hot path can do a single hashed
+# set intersection per cell instead of a substring scan per keyword.
+_SKIP_WORDS = frozenset(k.lower() for k in [
+    'Captain', 'Co-Captain', 'Team', 'League', 'Division', 'Win', 'Loss', 'Rating',
+    'City', 'Gender', 'Matches', 'Player', 'Status', 'Outcome', 'Round', 'Home',
+    'Away', 'Confirmed', 'Scheduled', 'Defaults', 'Singles', 'Doubles', 'Eligibility',
+    'Expiration', 'Local', 'Sectional', 'National', 'PlayOff', 'Registration',
+    'Closed', 'Currently', 'playing', 'If', 'a', 'problem', 'exists', 'Red',
+    'Rostered', 'Individual', 'Won', 'Scheduled', 'Day', 'Match', 'date', 'time',
+    'Standings', 'Rules', 'Newsletters', 'Availability', 'Coordinator', 'Print',
+    'Blank', 'Score', 'Card', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'
+])
+
+# Common city names and locations in Northern California
+_CITY_WORDS = frozenset(c.lower() for c in [
+    'Mountain', 'View', 'San', 'Jose', 'Santa', 'Clara', 'Sunnyvale', 'Fremont',
+    'Palo', 'Alto', 'Cupertino', 'Mateo', 'Antioch', 'Francisco',
+    'Campbell', 'Los', 'Gatos', 'Milpitas', 'Portola', 'Valley', 'Stanford',
+    'South', 'Dublin', 'Pleasanton', 'Hayward', 'Union',
+    'City', 'Newark', 'Livermore', 'Tracy', 'Manteca', 'Stockton',
+    'Modesto', 'Turlock', 'Merced', 'Fresno', 'Bakersfield', 'Sacramento',
+    'Davis', 'Vacaville', 'Fairfield', 'Vallejo', 'Richmond', 'Berkeley',
+    'Oakland', 'Alameda', 'Leandro', 'Castro', 'Redwood',
+    'Menlo', 'Park', 'Atherton', 'Woodside', 'Hillsborough', 'Burlingame',
+    'Carlos', 'Belmont', 'Foster',
+    'Shores', 'East', 'Altos', 'Saratoga', 'Monte',
+    'Sereno'
+])
+
+_COMMON_WORDS = frozenset([
+    'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'
+])
+
+# Only the tags each parser actually inspects; restricting the parse to
+# these avoids building tree nodes for the rest of the page.
+_PLAYER_PAGE_STRAINER = SoupStrainer(['h1', 'h2', 'h3', 'b', 'a', 'table'])
+_TEAM_PAGE_STRAINER = SoupStrainer(['a', 'table'])
+
 
 class USTACaptainAnalyzer:
     def __init__(self):
-        self.session = requests.Session()
+        # USTA pages change slowly; cache responses on disk for an hour so
+        # repeat runs skip the network entirely
+        self.session = requests_cache.CachedSession(
+            'captain_gang_cache', backend='sqlite', expire_after=3600
+        )
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
-        self.player_counts = defaultdict(int)
+        # Everything goes to one host, so keep a generous pool of reusable
+        # connections and let urllib3 retry transient server errors for us
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=('GET',)
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=32, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.player_counts = Counter()
         self.base_url = "https://leagues.ustanorcal.com"
+        self._next_allowed = 0.0  # Earliest monotonic time for the next server hit
+        self._rate_lock = threading.Lock()  # get_page runs from worker threads too
         
     def get_page(self, url):
         """Fetch a web page with error handling and rate limiting"""
         try:
             print(f"Fetching: {url}")
-            response = self.session.get(url, timeout=10)
+            # Serve straight from the cache when possible; a miss comes back
+            # as a synthetic 504 without touching the network
+            response = self.session.get(url, timeout=10, only_if_cached=True)
+            if response.status_code == 504:
+                # Real server hit: wait out whatever remains of the interval
+                # since the last one. Holding the lock while we sleep keeps
+                # concurrent worker threads at the same one-hit-per-interval
+                # pace; cache hits never touch the lock.
+                with self._rate_lock:
+                    wait = self._next_allowed - time.monotonic()
+                    if wait > 0:
+                        time.sleep(wait)
+                    self._next_allowed = time.monotonic() + REQUEST_INTERVAL
+                    response = self.session.get(url, timeout=10)
             response.raise_for_status()
-            time.sleep(1)  # Rate limiting
-            return response.text
+            # Return raw bytes: lxml sniffs the charset from the <meta> tag,
+            # so decoding to str here would just be a second, slower pass
+            return response.content
         except requests.RequestException as e:
             print(f"Error fetching {url}: {e}")
             return None
@@ -45,8 +136,9 @@ class USTACaptainAnalyzer:
         if not html:
             return [], None
         
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = BeautifulSoup(html, 'lxml', parse_only=_PLAYER_PAGE_STRAINER)
         captain_teams = []
+        seen_team_ids = set()  # The same team can be linked more than once
         player_name = None
         
         # Extract player name from the page header
@@ -54,10 +146,11 @@ class USTACaptainAnalyzer:
         name_elements = soup.find_all(['h1', 'h2', 'h3', 'b'])
         for element in name_elements:
             text = element.get_text(strip=True)
+            text_lower = text.lower()
             # Look for patterns that suggest this is the player name
-            if text and len(text) > 3 and not any(keyword in text.lower() for keyword in ['usta', 'northern', 'california', 'leagues', 'matches']):
+            if text and len(text) > 3 and not any(keyword in text_lower for keyword in ['usta', 'northern', 'california', 'leagues', 'matches']):
                 # Check if it looks like a name (contains letters and possibly commas)
-                if re.match(r'^[A-Za-z\s,\.]+$', text) and len(text.split()) >= 2:
+                if _NAME_RE.match(text) and len(text.split()) >= 2:
                     player_name = text
                     break
         
@@ -70,149 +163,154 @@ class USTACaptainAnalyzer:
                 cells = first_table.find_all(['td', 'th'])
                 for cell in cells:
                     text = cell.get_text(strip=True)
-                    if text and len(text) > 3 and re.match(r'^[A-Za-z\s,\.]+$', text) and len(text.split()) >= 2:
-                        if not any(keyword in text.lower() for keyword in ['usta', 'northern', 'california', 'leagues', 'matches', 'rating', 'expiration']):
+                    text_lower = text.lower()
+                    if text and len(text) > 3 and _NAME_RE.match(text) and len(text.split()) >= 2:
+                        if not any(keyword in text_lower for keyword in ['usta', 'northern', 'california', 'leagues', 'matches', 'rating', 'expiration']):
                             player_name = text
                             break
         
         # Look for team links where the player is a captain
         # The pattern shows "Captain" or "Co-Captain" in the team name
-        team_links = soup.find_all('a', href=re.compile(r'teaminfo\.asp\?id=\d+'))
-        
+        team_links = soup.select('a[href*="teaminfo.asp?id="]')
+
         for link in team_links:
             team_text = link.get_text(strip=True)
             if 'Captain' in team_text:
                 # Extract team ID from href
                 href = link.get('href')
-                team_id_match = re.search(r'id=(\d+)', href)
+                team_id_match = _TEAM_HREF_RE.search(href)
                 if team_id_match:
                     team_id = team_id_match.group(1)
+                    if team_id in seen_team_ids:
+                        continue
+                    seen_team_ids.add(team_id)
                     captain_teams.append({
                         'id': team_id,
                         'name': team_text,
                         'url': urljoin(self.base_url, href)
                     })
                     print(f"Found captain team: {team_text} (ID: {team_id})")
-        
+
+        # Everything we need is copied out into plain strings, so tear down
+        # the tree now instead of waiting for the garbage collector.
+        soup.decompose()
         return captain_teams, player_name
     
+    async def _fetch(self, url, semaphore):
+        """Fetch a single page through the cached session off the event loop"""
+        async with semaphore:
+            return await asyncio.to_thread(self.get_page, url)
+
+    async def _fetch_team_pages(self, teams):
+        """Fetch all team pages concurrently"""
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+        return await asyncio.gather(
+            *[self._fetch(team['url'], semaphore) for team in teams]
+        )
+
     def parse_team_page(self, team_info):
         """Parse a team page to extract all players"""
         html = self.get_page(team_info['url'])
         if not html:
             return []
-        
-        soup = BeautifulSoup(html, 'html.parser')
+        return self._parse_team_html(html, team_info)
+
+    def _parse_team_html(self, html, team_info):
+        """Extract all players from already-fetched team page HTML"""
+        soup = BeautifulSoup(html, 'lxml', parse_only=_TEAM_PAGE_STRAINER)
         players = []
         seen_players = set()  # Track unique players to avoid duplicates
+        names_seen = set()  # Names already captured, for the fallback scan
         
         # Look for player links in the team roster
         # Players are typically in a table with links to their profiles
-        player_links = soup.find_all('a', href=re.compile(r'playermatches\.asp\?id=\d+'))
-        
+        player_links = soup.select('a[href*="playermatches.asp?id="]')
+
         for link in player_links:
             player_text = link.get_text(strip=True)
             if player_text and len(player_text) > 2:  # Filter out empty or very short text
                 # Extract player ID
                 href = link.get('href')
-                player_id_match = re.search(r'id=(\d+)', href)
+                player_id_match = _PLAYER_HREF_RE.search(href)
                 if player_id_match:
                     player_id = player_id_match.group(1)
                     # Create a unique key for this player in this team
                     player_key = f"{player_id}_{player_text}"
                     if player_key not in seen_players:
                         seen_players.add(player_key)
+                        names_seen.add(player_text)
                         players.append({
                             'id': player_id,
                             'name': player_text,
                             'team': team_info['name']
                         })
         
-        # Also look for players in table rows that might not have direct links
-        # This handles cases where player names are displayed differently
-        tables = soup.find_all('table')
-        for table in tables:
-            rows = table.find_all('tr')
-            for row in rows:
-                cells = row.find_all(['td', 'th'])
-                for cell in cells:
-                    # Look for text that might be player names
-                    text = cell.get_text(strip=True)
-                    if text and self.looks_like_player_name(text):
-                        # Check if this text is already captured as a link
-                        if not any(p['name'] == text for p in players):
-                            player_key = f"unknown_{text}"
-                            if player_key not in seen_players:
-                                seen_players.add(player_key)
-                                players.append({
-                                    'id': 'unknown',
-                                    'name': text,
-                                    'team': team_info['name']
-                                })
+        # On a normal roster page every player shows up as a link, so only
+        # fall back to scanning table cells when the anchor pass came up
+        # empty (e.g. an unusually formatted page)
+        if not players:
+            tables = soup.find_all('table')
+            for table in tables:
+                rows = table.find_all('tr')
+                for row in rows:
+                    cells = row.find_all(['td', 'th'])
+                    for cell in cells:
+                        # Look for text that might be player names
+                        text = cell.get_text(strip=True)
+                        if text and self.looks_like_player_name(text, text.lower()):
+                            # Check if this text is already captured as a link
+                            if text not in names_seen:
+                                player_key = f"unknown_{text}"
+                                if player_key not in seen_players:
+                                    seen_players.add(player_key)
+                                    names_seen.add(text)
+                                    players.append({
+                                        'id': 'unknown',
+                                        'name': text,
+                                        'team': team_info['name']
+                                    })
         
+        soup.decompose()
         print(f"Found {len(players)} players in team: {team_info['name']}")
         return players
     
-    def looks_like_player_name(self, text):
-        """Heuristic to determine if text looks like a player name"""
-        # Skip if it's too short or contains certain keywords
+    def looks_like_player_name(self, text, text_lower=None):
+        """Heuristic to determine if text looks like a player name
+
+        Callers that already lowercased the text can pass it in to avoid
+        doing so again here.
+        """
+        # Cheap structural checks first, so most cells never reach the
+        # keyword-set work below
         if len(text) < 3:
             return False
-        
-        skip_keywords = [
-            'Captain', 'Co-Captain', 'Team', 'League', 'Division', 'Win', 'Loss', 'Rating',
-            'City', 'Gender', 'Matches', 'Player', 'Status', 'Outcome', 'Round', 'Home',
-            'Away', 'Confirmed', 'Scheduled', 'Defaults', 'Singles', 'Doubles', 'Eligibility',
-            'Expiration', 'Local', 'Sectional', 'National', 'PlayOff', 'Registration',
-            'Closed', 'Currently', 'playing', 'If', 'a', 'problem', 'exists', 'Red',
-            'Rostered', 'Individual', 'Won', 'Scheduled', 'Day', 'Match', 'date', 'time',
-            'Standings', 'Rules', 'Newsletters', 'Availability', 'Coordinator', 'Print',
-            'Blank', 'Score', 'Card', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'
-        ]
-        
-        # Common city names and locations in Northern California
-        city_names = [
-            'Mountain', 'View', 'San', 'Jose', 'Santa', 'Clara', 'Sunnyvale', 'Fremont',
-            'Palo', 'Alto', 'Cupertino', 'San', 'Mateo', 'Antioch', 'San', 'Francisco',
-            'Campbell', 'Los', 'Gatos', 'Milpitas', 'Portola', 'Valley', 'Stanford',
-            'South', 'San', 'Francisco', 'Dublin', 'Pleasanton', 'Hayward', 'Union',
-            'City', 'Newark', 'Fremont', 'Livermore', 'Tracy', 'Manteca', 'Stockton',
-            'Modesto', 'Turlock', 'Merced', 'Fresno', 'Bakersfield', 'Sacramento',
-            'Davis', 'Vacaville', 'Fairfield', 'Vallejo', 'Richmond', 'Berkeley',
-            'Oakland', 'Alameda', 'San', 'Leandro', 'Castro', 'Valley', 'Redwood',
-            'City', 'Menlo', 'Park', 'Atherton', 'Woodside', 'Hillsborough', 'Burlingame',
-            'San', 'Carlos', 'Belmont', 'San', 'Mateo', 'Foster', 'City', 'Redwood',
-            'Shores', 'East', 'Palo', 'Alto', 'Los', 'Altos', 'Saratoga', 'Monte',
-            'Sereno', 'Los', 'Gatos', 'Campbell', 'San', 'Jose', 'Santa', 'Clara',
-            'Sunnyvale', 'Mountain', 'View', 'Palo', 'Alto', 'Menlo', 'Park'
-        ]
-        
-        # Check if any skip keyword is in the text
-        if any(keyword.lower() in text.lower() for keyword in skip_keywords):
+
+        # Skip if it's all uppercase (likely headers or labels)
+        if text.isupper():
             return False
-        
-        # Check if it's a city name
-        if any(city.lower() in text.lower() for city in city_names):
+
+        # Names start with a letter and contain only letters, spaces,
+        # commas, and periods
+        if not text[0].isalpha():
             return False
-        
-        # Skip if it's all uppercase (likely headers or labels)
-        if text.isupper() and len(text) > 3:
+        if not _ALLOWED_NAME_CHARS.issuperset(text):
             return False
-        
-        # Skip if it contains numbers only or special characters
-        if re.match(r'^[\d\s\-_]+$', text):
+
+        if text_lower is None:
+            text_lower = text.lower()
+
+        # Check the cell's words against the skip and city sets in one
+        # hashed intersection each
+        words = set(text_lower.split())
+        if words & _SKIP_WORDS:
             return False
-        
-        # Look for patterns that suggest player names
-        # Names typically have letters and might have commas, periods, or spaces
-        # Should have at least one letter and look like a name
-        if re.match(r'^[A-Za-z\s,\.]+$', text) and len(text.split()) >= 1:
-            # Additional check: should not be just common words
-            common_words = ['the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by']
-            if text.lower() not in common_words:
-                return True
-        
-        return False
+
+        # Check if it's a city name
+        if words & _CITY_WORDS:
+            return False
+
+        # Additional check: should not be just a common word
+        return text_lower not in _COMMON_WORDS
     
     def analyze_captain(self, player_id):
         """Main analysis function"""
@@ -226,17 +324,21 @@ class USTACaptainAnalyzer:
             return
         
         print(f"Found {len(captain_teams)} captain teams")
-        
-        # For each team, get all players
+
+        # Belt and braces: never fetch the same team page twice
+        captain_teams = list({team['id']: team for team in captain_teams}.values())
+
+        # Fetch all team pages concurrently, then parse each roster
         all_players = []
-        for team in captain_teams:
-            players = self.parse_team_page(team)
+        team_pages = asyncio.run(self._fetch_team_pages(captain_teams))
+        for team, html in zip(captain_teams, team_pages):
+            if not html:
+                continue
+            players = self._parse_team_html(html, team)
             all_players.extend(players)
         
         # Count how many times each player appears
-        player_counts = defaultdict(int)
-        for player in all_players:
-            player_counts[player['name']] += 1
+        player_counts = Counter(player['name'] for player in all_players)
         
         # Display results
         print("\n" + "="*60)